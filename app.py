@@ -1,7 +1,11 @@
 """Golden Formulas Graph - Main App."""
 
+import math
+import time
+from contextlib import contextmanager
+
 import streamlit as st
-from utils.supabase_client import get_all_domains, get_all_formulas, get_replicated_nodes
+from utils.supabase_client import fetch_concurrently, fetch_all_domains, fetch_all_formulas, get_replicated_nodes
 from streamlit_agraph import agraph, Node, Edge, Config
 import pandas as pd
 
@@ -12,34 +16,174 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Hide the sidebar navigation and collapse button
-st.markdown(
-    """
-    <style>
-        [data-testid="collapsedControl"] { display: none; }
-        section[data-testid="stSidebar"] { display: none; }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
-
 st.title("Golden Formulas")
+
+# Number of formulas rendered per page in the list view
+FORMULAS_PAGE_SIZE = 50
+
+# Performance notes: this page is bound by network round-trips and Python-level
+# work per rerun, not by numeric compute, so optimizations are tiered as:
+#   1. Supabase calls - load_data() fetches concurrently and is cached per ttl
+#   2. Per-rerun pandas/Python work - filter_principles() and build_graph_elements()
+#      are cached per filter signature
+#   3. Browser rendering - the list is paginated and graph physics is off
+# Open the page with ?debug=timings to toast how long each stage takes before
+# reaching for heavier tools (NumPy kernels, Numba, graph coarsening).
+SHOW_TIMINGS = st.query_params.get("debug") == "timings"
+
 # st.markdown("Visualize principles across domains of knowledge in graph format.")
 
 
 @st.cache_data(ttl=300)
 def load_data():
-    """Load all domains, formulas, and replicated nodes from the database."""
-    domains = get_all_domains()
-    formulas = get_all_formulas()
-    replicated_nodes = get_replicated_nodes()
-    return domains, formulas, replicated_nodes
+    """Load all domains, formulas, and replicated nodes from the database.
+
+    Returns:
+        tuple: (domains, formulas, replicated_nodes, domain_options, domain_name_to_id, data_version),
+        where domain_options maps domain ID to name, domain_name_to_id is its inverse and
+        data_version is the fetch time, used to key the caches derived from this data
+    """
+    domains, formulas, replicated_nodes = fetch_concurrently(fetch_all_domains, fetch_all_formulas, get_replicated_nodes)
+    # Lowercase the principle text once per cache refresh so search is a plain substring test
+    for node in replicated_nodes:
+        node["principle_lower"] = (node.get("principle") or "").lower()
+    # Domain membership as sets so the domain filter is a hash intersection
+    for formula in formulas:
+        formula["domain_ids_set"] = frozenset(formula.get("domain_ids") or ())
+    domain_options = {d["id"]: d["name"] for d in domains}
+    domain_name_to_id = {name: did for did, name in domain_options.items()}
+    return domains, formulas, replicated_nodes, domain_options, domain_name_to_id, time.time()
+
+
+# The caches below are keyed on the data_version of the load_data() result they
+# are given (underscored arguments are not hashed), so they always match the data
+# the page loaded instead of expiring on timers of their own
+@st.cache_data(max_entries=2)
+def build_frames(_domains: list[dict], _replicated_nodes: list[dict], data_version: float):
+    """Build the principle, edge and domain-list frames from the loaded data.
+
+    Returns:
+        tuple: (principles_df, replicated_nodes_df, domains_list_df)
+    """
+    domains_df = pd.DataFrame(_domains)
+    # First keep all records because they represent the edges
+    replicated_nodes_df = pd.DataFrame(_replicated_nodes)
+    # Bring domains to have their names
+    replicated_nodes_df = replicated_nodes_df.merge(
+        domains_df[["id", "name"]].rename(columns={"id": "from_domain"}),
+        how="inner",
+        on="from_domain",
+        validate="many_to_one"
+    )
+    # Now keep just 1 of each principle to generate nodes
+    principles_df = replicated_nodes_df.drop_duplicates(subset=["principle"])
+
+    # Add domain string agg
+    # Calculated from the edges DF
+    domains_list_df = (
+        replicated_nodes_df[["principle", "name"]]
+        .drop_duplicates()
+        .groupby("principle", sort=False)["name"]
+        .agg(" | ".join)
+        .reset_index(name="domains_list")
+    )
+
+    return principles_df, replicated_nodes_df, domains_list_df
+
+
+@st.cache_data(max_entries=64)
+def filter_principles(
+    _formulas: list[dict],
+    _principles_df: pd.DataFrame,
+    data_version: float,
+    selected_domain_ids: tuple[str, ...],
+    search_query: str,
+    min_domains: int
+) -> pd.DataFrame:
+    """Return the principles matching a filter signature.
+
+    Args:
+        selected_domain_ids: Sorted domain IDs to keep, empty to keep all
+        search_query: Lowercased search text, empty to skip the search
+        min_domains: Minimum number of domains a principle must belong to
+    """
+    principles_df = _principles_df
+    # Apply user filters as one boolean mask so the frame is sliced a single time
+    filter_mask = principles_df["domain_count"] >= min_domains
+    # Filter dataset by domain if user selected any
+    if selected_domain_ids:
+        selected_set = frozenset(selected_domain_ids)
+        matching_formula_ids = [f["id"] for f in _formulas if not selected_set.isdisjoint(f["domain_ids_set"])]
+        filter_mask &= principles_df["id"].isin(matching_formula_ids)
+    # Filter by formula text search
+    if search_query:
+        filter_mask &= principles_df["principle_lower"].str.contains(search_query, regex=False)
+    return principles_df[filter_mask]
+
+
+@st.cache_data(max_entries=64)
+def build_graph_elements(
+    _principles_df: pd.DataFrame,
+    _replicated_nodes_df: pd.DataFrame,
+    data_version: float,
+    selected_domain_ids: tuple[str, ...],
+    search_query: str,
+    min_domains: int
+) -> tuple[list, list]:
+    """Build the graph nodes and edges for the principles kept by a filter signature.
+
+    Returns:
+        tuple: (nodes, edges)
+    """
+    principles_df = _principles_df
+    # Keep only the edges of the principles that survived the filters
+    replicated_nodes_df = _replicated_nodes_df[_replicated_nodes_df["id"].isin(principles_df["id"])]
+
+    # Generate nodes for principles
+    nodes = [
+        Node(
+            id=principle, 
+            label="", 
+            size=25, 
+            shape="circle",
+        ) for principle in principles_df["principle"].to_numpy()
+    ]
+    # And domains
+    nodes.extend([
+        Node(
+            id=name, 
+            label=name, 
+            shape="box",
+            color="orange"
+        ) for name in replicated_nodes_df["name"].unique()
+    ])
+
+    # And create principle->domain edges
+    edges = [
+        Edge(
+            source=principle, 
+            label=None, 
+            target=name
+        ) for principle, name in zip(replicated_nodes_df["principle"].to_numpy(), replicated_nodes_df["name"].to_numpy())
+    ]
+    return nodes, edges
+
+
+@contextmanager
+def timed(label: str):
+    """Toast the wall time of the block when timings are enabled."""
+    if not SHOW_TIMINGS:
+        yield
+        return
+    start = time.perf_counter()
+    yield
+    st.toast(f"{label}: {(time.perf_counter() - start) * 1000:.1f} ms", icon="⏱️")
 
 
 # Load data
 try:
-    with st.spinner("Loading data..."):
-        domains, formulas, replicated_nodes = load_data()
+    with st.spinner("Loading data..."), timed("Load data"):
+        domains, formulas, replicated_nodes, domain_options, domain_name_to_id, data_version = load_data()
 except Exception as e:
     st.error(f"Failed to load data: {str(e)}")
     st.stop()
@@ -56,7 +200,6 @@ min_domains = -1
 col_domain_filter, col_formula_search = st.columns([1, 1])
 
 with col_domain_filter:
-    domain_options = {d["id"]: d["name"] for d in domains}
     selected_domain_names = st.multiselect(
         "Filter by Domain",
         options=list(domain_options.values()),
@@ -65,72 +208,42 @@ with col_domain_filter:
     )
 
 with col_formula_search:
-    formula_search = st.text_input(
+    st.text_input(
         "Search Formula Text",
         placeholder="Type to filter formulas...",
-        help="Case-insensitive search within formula text"
+        help="Case-insensitive search within formula text",
+        key="formula_search"
     )
 
 # Create and display graph
 # st.markdown("---")
 
 
-# Create a principles DF to facilitate filters
-domains_df = pd.DataFrame(domains)
-# First keep all records because they represent the edges
-replicated_nodes_df = pd.DataFrame(replicated_nodes)
-# Bring domains to have their names
-replicated_nodes_df = replicated_nodes_df.merge(domains_df, how="inner", left_on="from_domain", right_on="id")
-# Now keep just 1 of each principle to generate nodes
-principles_df = replicated_nodes_df.drop_duplicates(subset=["principle"])
-
-# Apply user filters
-principles_df = principles_df.query(f"domain_count >= {min_domains}")
-# Filter dataset by domain if user selected any
-if selected_domain_names != list():
-    principles_df = principles_df.query(f"name in {selected_domain_names}")
-    domains = [domain for domain in domains if domain["name"] in selected_domain_names]
-# Filter by formula text search
-if formula_search.strip():
-    principles_df = principles_df[principles_df["principle"].str.contains(formula_search.strip(), case=False, na=False)]
+# The frames are built once per data version
+with timed("Build frames"):
+    all_principles_df, replicated_nodes_df, domains_list_df = build_frames(domains, replicated_nodes, data_version)
+
+# Filter results and graph elements are memoized per filter signature
+selected_domain_ids = tuple(sorted(domain_name_to_id[name] for name in selected_domain_names))
+search_query = st.session_state.get("formula_search", "").strip().lower()
+with timed("Filter principles"):
+    principles_df = filter_principles(
+        formulas, all_principles_df, data_version, selected_domain_ids, search_query, min_domains
+    )
 
 # Proceed to draw the visual if there is data after filters
 if not principles_df.empty:
-    # Generate nodes for principles
-    nodes = [
-        Node(
-            id=node["principle"], 
-            label="", 
-            size=25, 
-            shape="circle",
-        ) for index,node in principles_df.iterrows()
-    ]
-    # And domains
-    nodes.extend([
-        Node(
-            id=node["name"], 
-            label=node["name"], 
-            # id=domain['id'], 
-            # label=domain["name"], 
-            shape="box",
-            color="orange"
-        ) for index,node in principles_df.drop_duplicates(subset="name").iterrows()
-    ])
-
-    # And create principle->domain edges
-    edges = [
-        Edge(
-            source=edge["principle"], 
-            label=None, 
-            target=edge['name']
-        ) for index,edge in replicated_nodes_df.iterrows()
-    ]
+    with timed("Build graph elements"):
+        nodes, edges = build_graph_elements(
+            principles_df, replicated_nodes_df, data_version, selected_domain_ids, search_query, min_domains
+        )
 
     config = Config(
         width=2000,
         height=1000,
         directed=True, 
-        physics=True, 
+        # Nodes are placed once by the initial layout instead of a continuous simulation
+        physics=False, 
         hierarchical=False,
         navigationButtons=True
     )
@@ -151,21 +264,27 @@ if not principles_df.empty:
     if selected_principle != None:
         principles_df = principles_df[principles_df["principle"] == selected_principle]
     
-    # Add domain string agg
-    # Calculated from the edges DF
-    domains_list_df = replicated_nodes_df[["principle", "name"]].drop_duplicates()
-    domains_list_df["domains_list"] = domains_list_df.groupby(["principle"])["name"].transform(lambda x: " | ".join(x))
-    domains_list_df.drop_duplicates(subset="principle", inplace=True)
-    # Then joined back to the nodes DF
-    principles_df = principles_df.merge(domains_list_df, how="inner", left_on="principle", right_on="principle", suffixes=(None, "_listy"))
+    # Only render one page of expanders at a time
+    total_formulas = len(principles_df)
+    num_pages = math.ceil(total_formulas / FORMULAS_PAGE_SIZE)
+    if num_pages > 1:
+        page = st.number_input("Page", min_value=1, max_value=num_pages, value=1, step=1)
+        page_start = (page - 1) * FORMULAS_PAGE_SIZE
+        principles_df = principles_df.iloc[page_start:page_start + FORMULAS_PAGE_SIZE]
+        st.caption(f"Showing {page_start + 1}-{page_start + len(principles_df)} of {total_formulas} formulas")
+
+    # Join the precomputed domain string agg back to the nodes DF
+    principles_df = principles_df.merge(domains_list_df, how="left", on="principle", validate="1:1")
 
     # Now loop through formulas to write each
-    for index, formula in principles_df.iterrows():
+    for principle, reference, domains_list in principles_df[["principle", "reference", "domains_list"]].itertuples(index=False, name=None):
 
-        with st.expander(f"{formula['principle'][:80]}..." if len(formula['principle']) > 80 else formula['principle']):
-            st.markdown(f"**Formula:** {formula['principle']}")
-            st.markdown(f"**Reference:** {formula.get('reference', 'N/A')}")
-            st.markdown(f"**Domains:** {formula['domains_list']}")
+        with st.expander(f"{principle[:80]}..." if len(principle) > 80 else principle):
+            st.markdown(
+                f"**Formula:** {principle}\n\n"
+                f"**Reference:** {reference}\n\n"
+                f"**Domains:** {domains_list}"
+            )
 
 else:
     st.info("No formulas match the current filter.")
@@ -32,6 +32,8 @@ CREATE TABLE golden_formula_graph.formula_edges (
 );
 
 -- Indexes
+-- Domain names are unique regardless of case
+CREATE UNIQUE INDEX idx_golden_formula_graph_domains_name_lower ON golden_formula_graph.domains (lower(name));
 CREATE INDEX idx_golden_formula_graph_formulas_domain_ids ON golden_formula_graph.formulas USING GIN (domain_ids);
 CREATE INDEX idx_golden_formula_graph_edges_formula_a ON golden_formula_graph.formula_edges(formula_a_id);
 CREATE INDEX idx_golden_formula_graph_edges_formula_b ON golden_formula_graph.formula_edges(formula_b_id);
@@ -104,6 +106,50 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql SECURITY DEFINER;
 
+-- Remove a domain from every formula that references it in one statement
+-- (runs as the caller, so the formulas RLS policies still apply)
+CREATE OR REPLACE FUNCTION golden_formula_graph.remove_domain_from_formulas(target_domain_id UUID)
+RETURNS INTEGER AS $$
+DECLARE
+  updated_count INTEGER;
+BEGIN
+  UPDATE golden_formula_graph.formulas
+  SET domain_ids = array_remove(domain_ids, target_domain_id)
+  WHERE domain_ids @> ARRAY[target_domain_id];
+
+  GET DIAGNOSTICS updated_count = ROW_COUNT;
+  RETURN updated_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Remove a domain from its formulas and delete it in a single transaction
+CREATE OR REPLACE FUNCTION golden_formula_graph.delete_domain_cascade(target_domain_id UUID)
+RETURNS INTEGER AS $$
+DECLARE
+  updated_count INTEGER;
+BEGIN
+  updated_count := golden_formula_graph.remove_domain_from_formulas(target_domain_id);
+
+  DELETE FROM golden_formula_graph.domains
+  WHERE id = target_domain_id;
+
+  RETURN updated_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Seeding utility to wipe formulas and domains in one statement
+-- (formula_edges is emptied through its foreign keys by CASCADE)
+CREATE OR REPLACE FUNCTION golden_formula_graph.truncate_seed_tables()
+RETURNS void AS $$
+BEGIN
+  TRUNCATE golden_formula_graph.formulas, golden_formula_graph.domains RESTART IDENTITY CASCADE;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Only the seeding (service role) key may wipe the tables
+REVOKE EXECUTE ON FUNCTION golden_formula_graph.truncate_seed_tables() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION golden_formula_graph.truncate_seed_tables() TO service_role;
+
 -------- TRIGGERS
 -- Trigger to recalculate edges after INSERT
 CREATE TRIGGER trigger_recalculate_edges_on_insert
@@ -153,6 +199,12 @@ GRANT SELECT, INSERT, UPDATE, DELETE ON golden_formula_graph.formula_edges TO au
 GRANT EXECUTE ON FUNCTION golden_formula_graph.recalculate_all_edges() TO authenticated;
 GRANT EXECUTE ON FUNCTION golden_formula_graph.recalculate_formula_edges(UUID) TO authenticated;
 
+-- Domain cleanup functions are for signed-in admins only
+REVOKE EXECUTE ON FUNCTION golden_formula_graph.remove_domain_from_formulas(UUID) FROM PUBLIC, anon;
+REVOKE EXECUTE ON FUNCTION golden_formula_graph.delete_domain_cascade(UUID) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION golden_formula_graph.remove_domain_from_formulas(UUID) TO authenticated;
+GRANT EXECUTE ON FUNCTION golden_formula_graph.delete_domain_cascade(UUID) TO authenticated;
+
 -------- RLS
 -- Enable Row Level Security
 ALTER TABLE golden_formula_graph.domains ENABLE ROW LEVEL SECURITY;
@@ -1,6 +1,9 @@
 """Admin CRUD Page - Auth Protected."""
 
+import math
+
 import streamlit as st
+from postgrest.exceptions import APIError
 from utils.auth import (
     init_auth_state,
     is_authenticated,
@@ -8,21 +11,22 @@ from utils.auth import (
     logout
 )
 from utils.supabase_client import (
+    fetch_concurrently,
     get_all_domains,
     get_all_formulas,
-    get_domain_by_name,
     create_domain,
+    get_or_create_domain,
     update_domain,
     delete_domain,
     delete_domain_cascade,
-    is_domain_used_by_formulas,
-    get_formulas_using_domain,
     create_formula,
     update_formula,
     delete_formula,
-    get_formula_by_id
+    get_formula_by_id,
+    search_formulas,
+    UNIQUE_VIOLATION
 )
-from utils.utils import build_domain_lookup, resolve_formula_domains
+from utils.utils import build_domain_lookup, resolve_formula_domain_names
 
 
 
@@ -33,16 +37,8 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Hide the sidebar navigation
-st.markdown(
-    """
-    <style>
-        [data-testid="collapsedControl"] { display: none; }
-        section[data-testid="stSidebar"] { display: none; }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
+# Number of formulas listed per page in the Formulas tab
+FORMULAS_PAGE_SIZE = 25
 
 # Initialize auth state
 init_auth_state()
@@ -60,26 +56,340 @@ def clear_form_state():
             del st.session_state[key]
 
 
-def refresh_data():
-    """Clear cached data and refresh."""
-    if "domains_cache" in st.session_state:
-        del st.session_state["domains_cache"]
-    if "formulas_cache" in st.session_state:
-        del st.session_state["formulas_cache"]
+def reset_formula_page():
+    """Return the formulas list to its first page."""
+    st.session_state.pop("admin_formula_page", None)
+
+
+def resolve_domain_id(name: str, domain_ids_by_name: dict[str, str]) -> str | None:
+    """Resolve a typed domain name to its ID, creating the domain only if it is not known yet."""
+    domain_id = domain_ids_by_name.get(name.lower())
+    if domain_id:
+        return domain_id
+    return get_or_create_domain(name).get("id")
+
+
+def build_formula_rows(formulas: list[dict], domain_lookup: dict[str, str]) -> list[dict]:
+    """Build the formula display rows with their principle previews and domain tags precomputed."""
+    return [
+        {
+            "id": f["id"],
+            "principle": f["principle"],
+            "preview": f"{f['principle'][:80]}..." if len(f["principle"]) > 80 else f["principle"],
+            "reference": f.get("reference", "N/A"),
+            "domain_ids": f.get("domain_ids") or [],
+            "domain_tags": ", ".join(resolve_formula_domain_names(f, domain_lookup)) or "No domains",
+        }
+        for f in formulas
+    ]
+
+
+# List and toolbar buttons act through on_click callbacks, which run before the
+# rerun their click triggers, so the page reflects the change without a second run.
+def set_flash(message: str, error: bool = False):
+    """Queue a message to show after the next rerun."""
+    st.session_state["admin_flash"] = ("error" if error else "success", message)
+
+
+def open_add_domain():
+    """Show the add domain form."""
+    st.session_state["show_add_domain"] = True
+    st.session_state.pop("edit_domain_id", None)
+
+
+def open_edit_domain(domain_id: str):
+    """Show the edit form for a domain."""
+    st.session_state["edit_domain_id"] = domain_id
+    st.session_state.pop("show_add_domain", None)
+
+
+def request_domain_delete(domain: dict, in_use: bool):
+    """Delete an unused domain, or ask for confirmation if formulas still use it."""
+    if in_use:
+        st.session_state["confirm_delete_domain_id"] = domain["id"]
+        st.session_state["confirm_delete_domain_name"] = domain["name"]
+        return
+    try:
+        delete_domain(domain["id"])
+        set_flash(f"Domain '{domain['name']}' deleted.")
+        reset_formula_page()
+    except Exception as e:
+        set_flash(f"Failed to delete domain: {str(e)}", error=True)
+
+
+def clear_domain_delete_confirmation():
+    """Dismiss the cascade delete confirmation."""
+    st.session_state.pop("confirm_delete_domain_id", None)
+    st.session_state.pop("confirm_delete_domain_name", None)
+
+
+def confirm_domain_cascade_delete(domain_id: str, domain_name: str):
+    """Remove a domain from every formula using it, then delete it."""
+    try:
+        success, updated_count = delete_domain_cascade(domain_id)
+        set_flash(
+            f"Domain '{domain_name}' deleted. "
+            f"Removed from {updated_count} formula(s)."
+        )
+        clear_domain_delete_confirmation()
+        reset_formula_page()
+    except Exception as e:
+        set_flash(f"Failed to delete domain: {str(e)}", error=True)
+
+
+def open_add_formula():
+    """Show the add formula form."""
+    st.session_state["show_add_formula"] = True
+    st.session_state.pop("edit_formula_id", None)
+
+
+def open_edit_formula(formula_id: str):
+    """Show the edit form for a formula."""
+    st.session_state["edit_formula_id"] = formula_id
+    st.session_state.pop("show_add_formula", None)
+
 
+def remove_formula(formula_id: str):
+    """Delete a formula from the list."""
+    try:
+        delete_formula(formula_id)
+        set_flash("Formula deleted.")
+        reset_formula_page()
+    except Exception as e:
+        set_flash(f"Failed to delete formula: {str(e)}", error=True)
+
+
+# Forms run as fragments: a submission that fails validation only reruns the form,
+# while successful saves and cancels rerun the whole page to refresh the lists.
+@st.fragment
+def add_domain_form(domain_ids_by_name: dict[str, str]):
+    """Render the Add Domain form."""
+    st.markdown("#### Add New Domain")
+    with st.form("add_domain_form"):
+        new_domain_name = st.text_input("Domain Name", placeholder="Enter domain name")
+        col_save, col_cancel = st.columns(2)
+
+        with col_save:
+            save_clicked = st.form_submit_button("Save", use_container_width=True)
+        with col_cancel:
+            cancel_clicked = st.form_submit_button("Cancel", use_container_width=True)
+
+        if save_clicked:
+            if not new_domain_name.strip():
+                st.error("Domain name cannot be empty.")
+            else:
+                # Check for duplicate against the loaded domains
+                if new_domain_name.strip().lower() in domain_ids_by_name:
+                    st.error(f"Domain '{new_domain_name}' already exists.")
+                else:
+                    try:
+                        with st.spinner("Creating domain..."):
+                            create_domain(new_domain_name.strip())
+                        set_flash(f"Domain '{new_domain_name}' created successfully!")
+                        reset_formula_page()
+                        st.session_state["show_add_domain"] = False
+                        st.rerun(scope="app")
+                    except APIError as e:
+                        # Another session created the same name, in any case, after this page loaded
+                        if e.code == UNIQUE_VIOLATION:
+                            st.error(f"Domain '{new_domain_name}' already exists.")
+                        else:
+                            st.error(f"Failed to create domain: {str(e)}")
+                    except Exception as e:
+                        st.error(f"Failed to create domain: {str(e)}")
+
+        if cancel_clicked:
+            st.session_state["show_add_domain"] = False
+            st.rerun(scope="app")
+
+
+@st.fragment
+def edit_domain_form(domain: dict, domain_ids_by_name: dict[str, str]):
+    """Render the Edit Domain form for a domain."""
+    domain_id = domain["id"]
+    st.markdown("#### Edit Domain")
+    with st.form("edit_domain_form"):
+        edited_name = st.text_input("Domain Name", value=domain["name"])
+        col_save, col_cancel = st.columns(2)
 
-def get_cached_domains():
-    """Get domains with session-level caching."""
-    if "domains_cache" not in st.session_state:
-        st.session_state["domains_cache"] = get_all_domains()
-    return st.session_state["domains_cache"]
+        with col_save:
+            save_clicked = st.form_submit_button("Save Changes", use_container_width=True)
+        with col_cancel:
+            cancel_clicked = st.form_submit_button("Cancel", use_container_width=True)
+
+        if save_clicked:
+            if not edited_name.strip():
+                st.error("Domain name cannot be empty.")
+            elif edited_name.strip() != domain["name"]:
+                # Check for duplicate against the loaded domains
+                existing_id = domain_ids_by_name.get(edited_name.strip().lower())
+                if existing_id and existing_id != domain_id:
+                    st.error(f"Domain '{edited_name}' already exists.")
+                else:
+                    try:
+                        with st.spinner("Updating domain..."):
+                            update_domain(domain_id, edited_name.strip())
+                        set_flash("Domain updated successfully!")
+                        reset_formula_page()
+                        del st.session_state["edit_domain_id"]
+                        st.rerun(scope="app")
+                    except Exception as e:
+                        st.error(f"Failed to update domain: {str(e)}")
+            else:
+                del st.session_state["edit_domain_id"]
+                st.rerun(scope="app")
+
+        if cancel_clicked:
+            del st.session_state["edit_domain_id"]
+            st.rerun(scope="app")
+
+
+@st.fragment
+def add_formula_form(domain_options: dict[str, str], domain_ids_by_name: dict[str, str]):
+    """Render the Add Formula form."""
+    domain_names = list(domain_options.keys())
+    st.markdown("#### Add New Formula")
+
+    with st.form("add_formula_form"):
+        principle = st.text_area(
+            "Principle",
+            placeholder="Enter the formula/principle text",
+            height=100
+        )
+
+        # Domain selection with option to add new
+        selected_domains = st.multiselect(
+            "Domains",
+            options=domain_names,
+            help="Select one or more domains for this formula"
+        )
+
+        # Add new domain inline
+        new_domain_name = st.text_input(
+            "Or add a new domain",
+            placeholder="Enter new domain name (optional)"
+        )
+
+        reference = st.text_input(
+            "Reference",
+            placeholder="Source/reference for this formula"
+        )
+
+        col_save, col_cancel = st.columns(2)
+
+        with col_save:
+            save_clicked = st.form_submit_button("Save Formula", use_container_width=True)
+        with col_cancel:
+            cancel_clicked = st.form_submit_button("Cancel", use_container_width=True)
+
+        if save_clicked:
+            if not principle.strip():
+                st.error("Principle cannot be empty.")
+            else:
+                try:
+                    # Collect domain IDs
+                    selected_domain_ids = [domain_options[name] for name in selected_domains]
+
+                    # Create new domain if specified
+                    if new_domain_name.strip():
+                        new_domain_id = resolve_domain_id(new_domain_name.strip(), domain_ids_by_name)
+                        if new_domain_id:
+                            selected_domain_ids.append(new_domain_id)
+
+                    with st.spinner("Creating formula..."):
+                        create_formula(
+                            principle=principle.strip(),
+                            domain_ids=selected_domain_ids,
+                            reference=reference.strip()
+                        )
+
+                    set_flash("Formula created successfully!")
+                    reset_formula_page()
+                    st.session_state["show_add_formula"] = False
+                    st.rerun(scope="app")
 
+                except Exception as e:
+                    st.error(f"Failed to create formula: {str(e)}")
+
+        if cancel_clicked:
+            st.session_state["show_add_formula"] = False
+            st.rerun(scope="app")
+
+
+@st.fragment
+def edit_formula_form(formula: dict, domain_lookup: dict[str, str], domain_options: dict[str, str], domain_ids_by_name: dict[str, str]):
+    """Render the Edit Formula form for a formula."""
+    formula_id = formula["id"]
+    domain_names = list(domain_options.keys())
+    st.markdown("#### Edit Formula")
+
+    # Get current domain names
+    current_domain_names = resolve_formula_domain_names(formula, domain_lookup)
+
+    with st.form("edit_formula_form"):
+        edited_principle = st.text_area(
+            "Principle",
+            value=formula.get("principle", ""),
+            height=100
+        )
+
+        edited_domains = st.multiselect(
+            "Domains",
+            options=domain_names,
+            default=[name for name in current_domain_names if name in domain_names]
+        )
+
+        # Add new domain inline
+        new_domain_name = st.text_input(
+            "Or add a new domain",
+            placeholder="Enter new domain name (optional)"
+        )
+
+        edited_reference = st.text_input(
+            "Reference",
+            value=formula.get("reference", "")
+        )
+
+        col_save, col_cancel = st.columns(2)
+
+        with col_save:
+            save_clicked = st.form_submit_button("Save Changes", use_container_width=True)
+        with col_cancel:
+            cancel_clicked = st.form_submit_button("Cancel", use_container_width=True)
 
-def get_cached_formulas():
-    """Get formulas with session-level caching."""
-    if "formulas_cache" not in st.session_state:
-        st.session_state["formulas_cache"] = get_all_formulas()
-    return st.session_state["formulas_cache"]
+        if save_clicked:
+            if not edited_principle.strip():
+                st.error("Principle cannot be empty.")
+            else:
+                try:
+                    # Collect domain IDs
+                    edited_domain_ids = [domain_options[name] for name in edited_domains]
+
+                    # Create new domain if specified
+                    if new_domain_name.strip():
+                        new_domain_id = resolve_domain_id(new_domain_name.strip(), domain_ids_by_name)
+                        if new_domain_id:
+                            edited_domain_ids.append(new_domain_id)
+
+                    with st.spinner("Updating formula..."):
+                        update_formula(
+                            formula_id=formula_id,
+                            principle=edited_principle.strip(),
+                            domain_ids=edited_domain_ids,
+                            reference=edited_reference.strip()
+                        )
+
+                    set_flash("Formula updated successfully!")
+                    reset_formula_page()
+                    del st.session_state["edit_formula_id"]
+                    st.rerun(scope="app")
+
+                except Exception as e:
+                    st.error(f"Failed to update formula: {str(e)}")
+
+        if cancel_clicked:
+            del st.session_state["edit_formula_id"]
+            st.rerun(scope="app")
 
 
 # Main content
@@ -98,12 +408,33 @@ if not is_authenticated():
 with col_logout:
     st.markdown("<br>", unsafe_allow_html=True)
     st.caption(f"Logged in as: {st.session_state.user_email}")
-    if st.button("Logout", use_container_width=True):
-        logout()
-        st.rerun()
+    st.button("Logout", use_container_width=True, on_click=logout)
 
 st.markdown("---")
 
+# Show the outcome of the last list action
+flash = st.session_state.pop("admin_flash", None)
+if flash:
+    kind, message = flash
+    if kind == "error":
+        st.error(message)
+    else:
+        st.toast(message)
+
+# Load domains and formulas once for the page; domain usage checks and
+# domain name lookups are answered from them
+try:
+    domains, formulas = fetch_concurrently(get_all_domains, get_all_formulas)
+except Exception as e:
+    st.error(f"Failed to load data: {str(e)}")
+    domains = []
+    formulas = []
+used_domain_ids = {did for f in formulas for did in (f.get("domain_ids") or [])}
+domain_lookup = build_domain_lookup(domains)
+domains_by_id = {d["id"]: d for d in domains}
+formulas_by_id = {f["id"]: f for f in formulas}
+domain_ids_by_name = {d["name"].strip().lower(): d["id"] for d in domains}
+
 # Tabs for Domains and Formulas management
 tab_domains, tab_formulas = st.tabs(["Domains", "Formulas"])
 
@@ -113,134 +444,56 @@ with tab_domains:
 
     col1, col2 = st.columns([3, 1])
     with col2:
-        if st.button("+ Add Domain", use_container_width=True, key="add_domain_btn"):
-            st.session_state["show_add_domain"] = True
-            st.session_state.pop("edit_domain_id", None)
+        st.button("+ Add Domain", use_container_width=True, key="add_domain_btn", on_click=open_add_domain)
 
     # Add Domain Form
     if st.session_state.get("show_add_domain"):
-        st.markdown("#### Add New Domain")
-        with st.form("add_domain_form"):
-            new_domain_name = st.text_input("Domain Name", placeholder="Enter domain name")
-            col_save, col_cancel = st.columns(2)
-
-            with col_save:
-                save_clicked = st.form_submit_button("Save", use_container_width=True)
-            with col_cancel:
-                cancel_clicked = st.form_submit_button("Cancel", use_container_width=True)
-
-            if save_clicked:
-                if not new_domain_name.strip():
-                    st.error("Domain name cannot be empty.")
-                else:
-                    # Check for duplicate
-                    existing = get_domain_by_name(new_domain_name.strip())
-                    if existing:
-                        st.error(f"Domain '{new_domain_name}' already exists.")
-                    else:
-                        try:
-                            with st.spinner("Creating domain..."):
-                                create_domain(new_domain_name.strip())
-                            st.success(f"Domain '{new_domain_name}' created successfully!")
-                            refresh_data()
-                            st.session_state["show_add_domain"] = False
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"Failed to create domain: {str(e)}")
-
-            if cancel_clicked:
-                st.session_state["show_add_domain"] = False
-                st.rerun()
-
+        add_domain_form(domain_ids_by_name)
         st.markdown("---")
 
     # Edit Domain Form
     if st.session_state.get("edit_domain_id"):
         domain_id = st.session_state["edit_domain_id"]
-        domains = get_cached_domains()
-        domain = next((d for d in domains if d["id"] == domain_id), None)
+        domain = domains_by_id.get(domain_id)
 
         if domain:
-            st.markdown("#### Edit Domain")
-            with st.form("edit_domain_form"):
-                edited_name = st.text_input("Domain Name", value=domain["name"])
-                col_save, col_cancel = st.columns(2)
-
-                with col_save:
-                    save_clicked = st.form_submit_button("Save Changes", use_container_width=True)
-                with col_cancel:
-                    cancel_clicked = st.form_submit_button("Cancel", use_container_width=True)
-
-                if save_clicked:
-                    if not edited_name.strip():
-                        st.error("Domain name cannot be empty.")
-                    elif edited_name.strip() != domain["name"]:
-                        # Check for duplicate
-                        existing = get_domain_by_name(edited_name.strip())
-                        if existing and existing["id"] != domain_id:
-                            st.error(f"Domain '{edited_name}' already exists.")
-                        else:
-                            try:
-                                with st.spinner("Updating domain..."):
-                                    update_domain(domain_id, edited_name.strip())
-                                st.success(f"Domain updated successfully!")
-                                refresh_data()
-                                del st.session_state["edit_domain_id"]
-                                st.rerun()
-                            except Exception as e:
-                                st.error(f"Failed to update domain: {str(e)}")
-                    else:
-                        del st.session_state["edit_domain_id"]
-                        st.rerun()
-
-                if cancel_clicked:
-                    del st.session_state["edit_domain_id"]
-                    st.rerun()
-
+            edit_domain_form(domain, domain_ids_by_name)
             st.markdown("---")
 
     # Confirm Delete Domain Dialog
     if st.session_state.get("confirm_delete_domain_id"):
         domain_id = st.session_state["confirm_delete_domain_id"]
         domain_name = st.session_state.get("confirm_delete_domain_name", "this domain")
-        formulas_using = get_formulas_using_domain(domain_id)
+        formulas_using = build_formula_rows(
+            [f for f in formulas if domain_id in (f.get("domain_ids") or [])], domain_lookup
+        )
 
         st.warning(f"**'{domain_name}'** is used by {len(formulas_using)} formula(s).")
 
         with st.expander("Show affected formulas", expanded=True):
             for f in formulas_using:
-                principle_preview = f["principle"][:60] + "..." if len(f["principle"]) > 60 else f["principle"]
-                st.markdown(f"- {principle_preview}")
+                st.markdown(f"- {f['preview']}")
 
         st.markdown("**Choose an action:**")
         col_cascade, col_cancel = st.columns(2)
 
         with col_cascade:
-            if st.button(
+            st.button(
                 f"Remove from formulas & delete",
                 key="confirm_cascade_delete",
                 use_container_width=True,
-                type="primary"
-            ):
-                try:
-                    with st.spinner("Removing domain from formulas and deleting..."):
-                        success, updated_count = delete_domain_cascade(domain_id)
-                    st.success(
-                        f"Domain '{domain_name}' deleted. "
-                        f"Removed from {updated_count} formula(s)."
-                    )
-                    st.session_state.pop("confirm_delete_domain_id", None)
-                    st.session_state.pop("confirm_delete_domain_name", None)
-                    refresh_data()
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"Failed to delete domain: {str(e)}")
+                type="primary",
+                on_click=confirm_domain_cascade_delete,
+                args=(domain_id, domain_name)
+            )
 
         with col_cancel:
-            if st.button("Cancel", key="cancel_cascade_delete", use_container_width=True):
-                st.session_state.pop("confirm_delete_domain_id", None)
-                st.session_state.pop("confirm_delete_domain_name", None)
-                st.rerun()
+            st.button(
+                "Cancel",
+                key="cancel_cascade_delete",
+                use_container_width=True,
+                on_click=clear_domain_delete_confirmation
+            )
 
         st.markdown("---")
 
@@ -248,8 +501,6 @@ with tab_domains:
     st.markdown("#### All Domains")
 
     try:
-        domains = get_cached_domains()
-
         if not domains:
             st.info("No domains found. Create your first domain above.")
         else:
@@ -260,27 +511,22 @@ with tab_domains:
                     st.markdown(f"**{domain['name']}**")
 
                 with col_edit:
-                    if st.button("Edit", key=f"edit_domain_{domain['id']}", use_container_width=True):
-                        st.session_state["edit_domain_id"] = domain["id"]
-                        st.session_state.pop("show_add_domain", None)
-                        st.rerun()
+                    st.button(
+                        "Edit",
+                        key=f"edit_domain_{domain['id']}",
+                        use_container_width=True,
+                        on_click=open_edit_domain,
+                        args=(domain["id"],)
+                    )
 
                 with col_delete:
-                    if st.button("Delete", key=f"delete_domain_{domain['id']}", use_container_width=True):
-                        # Check if domain is used by formulas
-                        if is_domain_used_by_formulas(domain["id"]):
-                            st.session_state["confirm_delete_domain_id"] = domain["id"]
-                            st.session_state["confirm_delete_domain_name"] = domain["name"]
-                            st.rerun()
-                        else:
-                            try:
-                                with st.spinner("Deleting domain..."):
-                                    delete_domain(domain["id"])
-                                st.success(f"Domain '{domain['name']}' deleted.")
-                                refresh_data()
-                                st.rerun()
-                            except Exception as e:
-                                st.error(f"Failed to delete domain: {str(e)}")
+                    st.button(
+                        "Delete",
+                        key=f"delete_domain_{domain['id']}",
+                        use_container_width=True,
+                        on_click=request_domain_delete,
+                        args=(domain, domain["id"] in used_domain_ids)
+                    )
 
     except Exception as e:
         st.error(f"Failed to load domains: {str(e)}")
@@ -291,219 +537,83 @@ with tab_formulas:
 
     col1, col2 = st.columns([3, 1])
     with col2:
-        if st.button("+ Add Formula", use_container_width=True, key="add_formula_btn"):
-            st.session_state["show_add_formula"] = True
-            st.session_state.pop("edit_formula_id", None)
+        st.button("+ Add Formula", use_container_width=True, key="add_formula_btn", on_click=open_add_formula)
 
-    # Get domains for selects
-    try:
-        domains = get_cached_domains()
-        domain_options = {d["name"]: d["id"] for d in domains}
-        domain_names = list(domain_options.keys())
-    except Exception as e:
-        st.error(f"Failed to load domains: {str(e)}")
-        domains = []
-        domain_options = {}
-        domain_names = []
+    # Domain lookups for selects
+    domain_options = {d["name"]: d["id"] for d in domains}
 
     # Add Formula Form
     if st.session_state.get("show_add_formula"):
-        st.markdown("#### Add New Formula")
-
-        with st.form("add_formula_form"):
-            principle = st.text_area(
-                "Principle",
-                placeholder="Enter the formula/principle text",
-                height=100
-            )
-
-            # Domain selection with option to add new
-            selected_domains = st.multiselect(
-                "Domains",
-                options=domain_names,
-                help="Select one or more domains for this formula"
-            )
-
-            # Add new domain inline
-            new_domain_name = st.text_input(
-                "Or add a new domain",
-                placeholder="Enter new domain name (optional)"
-            )
-
-            reference = st.text_input(
-                "Reference",
-                placeholder="Source/reference for this formula"
-            )
-
-            col_save, col_cancel = st.columns(2)
-
-            with col_save:
-                save_clicked = st.form_submit_button("Save Formula", use_container_width=True)
-            with col_cancel:
-                cancel_clicked = st.form_submit_button("Cancel", use_container_width=True)
-
-            if save_clicked:
-                if not principle.strip():
-                    st.error("Principle cannot be empty.")
-                else:
-                    try:
-                        # Collect domain IDs
-                        selected_domain_ids = [domain_options[name] for name in selected_domains]
-
-                        # Create new domain if specified
-                        if new_domain_name.strip():
-                            existing = get_domain_by_name(new_domain_name.strip())
-                            if existing:
-                                selected_domain_ids.append(existing["id"])
-                            else:
-                                new_domain = create_domain(new_domain_name.strip())
-                                if new_domain:
-                                    selected_domain_ids.append(new_domain["id"])
-
-                        with st.spinner("Creating formula..."):
-                            create_formula(
-                                principle=principle.strip(),
-                                domain_ids=selected_domain_ids,
-                                reference=reference.strip()
-                            )
-
-                        st.success("Formula created successfully!")
-                        refresh_data()
-                        st.session_state["show_add_formula"] = False
-                        st.rerun()
-
-                    except Exception as e:
-                        st.error(f"Failed to create formula: {str(e)}")
-
-            if cancel_clicked:
-                st.session_state["show_add_formula"] = False
-                st.rerun()
-
+        add_formula_form(domain_options, domain_ids_by_name)
         st.markdown("---")
 
     # Edit Formula Form
     if st.session_state.get("edit_formula_id"):
         formula_id = st.session_state["edit_formula_id"]
-        formula = get_formula_by_id(formula_id)
+        formula = formulas_by_id.get(formula_id) or get_formula_by_id(formula_id)
 
         if formula:
-            st.markdown("#### Edit Formula")
-
-            # Get current domain names
-            domain_lookup = build_domain_lookup(domains)
-            current_domains = resolve_formula_domains(formula, domain_lookup)
-            current_domain_names = [d["name"] for d in current_domains]
-
-            with st.form("edit_formula_form"):
-                edited_principle = st.text_area(
-                    "Principle",
-                    value=formula.get("principle", ""),
-                    height=100
-                )
-
-                edited_domains = st.multiselect(
-                    "Domains",
-                    options=domain_names,
-                    default=[name for name in current_domain_names if name in domain_names]
-                )
-
-                # Add new domain inline
-                new_domain_name = st.text_input(
-                    "Or add a new domain",
-                    placeholder="Enter new domain name (optional)"
-                )
-
-                edited_reference = st.text_input(
-                    "Reference",
-                    value=formula.get("reference", "")
-                )
-
-                col_save, col_cancel = st.columns(2)
-
-                with col_save:
-                    save_clicked = st.form_submit_button("Save Changes", use_container_width=True)
-                with col_cancel:
-                    cancel_clicked = st.form_submit_button("Cancel", use_container_width=True)
-
-                if save_clicked:
-                    if not edited_principle.strip():
-                        st.error("Principle cannot be empty.")
-                    else:
-                        try:
-                            # Collect domain IDs
-                            edited_domain_ids = [domain_options[name] for name in edited_domains]
-
-                            # Create new domain if specified
-                            if new_domain_name.strip():
-                                existing = get_domain_by_name(new_domain_name.strip())
-                                if existing:
-                                    edited_domain_ids.append(existing["id"])
-                                else:
-                                    new_domain = create_domain(new_domain_name.strip())
-                                    if new_domain:
-                                        edited_domain_ids.append(new_domain["id"])
-
-                            with st.spinner("Updating formula..."):
-                                update_formula(
-                                    formula_id=formula_id,
-                                    principle=edited_principle.strip(),
-                                    domain_ids=edited_domain_ids,
-                                    reference=edited_reference.strip()
-                                )
-
-                            st.success("Formula updated successfully!")
-                            refresh_data()
-                            del st.session_state["edit_formula_id"]
-                            st.rerun()
-
-                        except Exception as e:
-                            st.error(f"Failed to update formula: {str(e)}")
-
-                if cancel_clicked:
-                    del st.session_state["edit_formula_id"]
-                    st.rerun()
-
+            edit_formula_form(formula, domain_lookup, domain_options, domain_ids_by_name)
             st.markdown("---")
 
-    # List all formulas
+    # List formulas one page at a time, searched and paginated by the database
     st.markdown("#### All Formulas")
 
-    try:
-        formulas = get_cached_formulas()
-        domain_lookup = build_domain_lookup(domains)
+    formula_search = st.text_input(
+        "Search",
+        placeholder="Filter formulas by principle text",
+        key="admin_formula_search",
+        on_change=reset_formula_page
+    ).strip()
+    page = st.session_state.get("admin_formula_page", 1)
 
-        if not formulas:
-            st.info("No formulas found. Create your first formula above.")
+    try:
+        page_formulas, total_formulas = search_formulas(
+            formula_search, (page - 1) * FORMULAS_PAGE_SIZE, FORMULAS_PAGE_SIZE
+        )
+
+        if not total_formulas:
+            if formula_search:
+                st.info("No formulas match the search.")
+            else:
+                st.info("No formulas found. Create your first formula above.")
         else:
-            for formula in formulas:
-                formula_domains = resolve_formula_domains(formula, domain_lookup)
-                domain_tags = ", ".join([d["name"] for d in formula_domains]) if formula_domains else "No domains"
-
-                principle_preview = formula["principle"][:80] + "..." if len(formula["principle"]) > 80 else formula["principle"]
-
-                with st.expander(f"{principle_preview}"):
+            for formula in build_formula_rows(page_formulas, domain_lookup):
+                with st.expander(formula["preview"]):
                     st.markdown(f"**Principle:** {formula['principle']}")
-                    st.markdown(f"**Reference:** {formula.get('reference', 'N/A')}")
-                    st.markdown(f"**Domains:** {domain_tags}")
+                    st.markdown(f"**Reference:** {formula['reference']}")
+                    st.markdown(f"**Domains:** {formula['domain_tags']}")
 
                     col_edit, col_delete, col_spacer = st.columns([1, 1, 4])
 
                     with col_edit:
-                        if st.button("Edit", key=f"edit_formula_{formula['id']}", use_container_width=True):
-                            st.session_state["edit_formula_id"] = formula["id"]
-                            st.session_state.pop("show_add_formula", None)
-                            st.rerun()
+                        st.button(
+                            "Edit",
+                            key=f"edit_formula_{formula['id']}",
+                            use_container_width=True,
+                            on_click=open_edit_formula,
+                            args=(formula["id"],)
+                        )
 
                     with col_delete:
-                        if st.button("Delete", key=f"delete_formula_{formula['id']}", use_container_width=True):
-                            try:
-                                with st.spinner("Deleting formula..."):
-                                    delete_formula(formula["id"])
-                                st.success("Formula deleted.")
-                                refresh_data()
-                                st.rerun()
-                            except Exception as e:
-                                st.error(f"Failed to delete formula: {str(e)}")
+                        st.button(
+                            "Delete",
+                            key=f"delete_formula_{formula['id']}",
+                            use_container_width=True,
+                            on_click=remove_formula,
+                            args=(formula["id"],)
+                        )
+
+            num_pages = math.ceil(total_formulas / FORMULAS_PAGE_SIZE)
+            if num_pages > 1:
+                st.number_input(
+                    "Page",
+                    min_value=1,
+                    max_value=max(num_pages, page),
+                    step=1,
+                    key="admin_formula_page"
+                )
+                st.caption(f"{total_formulas} formulas")
 
     except Exception as e:
         st.error(f"Failed to load formulas: {str(e)}")
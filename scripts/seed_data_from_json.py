@@ -2,9 +2,12 @@
 
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
 
 from dotenv import load_dotenv
+from postgrest.types import ReturnMethod
 from supabase import create_client
 
 # Load environment variables from .env.local
@@ -18,12 +21,51 @@ SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_KEY")  # Use SERVICE ROLE key for see
 # Path to the JSON file containing formula records
 DATA_FILE = Path(__file__).parent / "formulas_data.json"
 
+# Maximum number of rows sent in a single insert request
+INSERT_CHUNK_SIZE = 500
+# Number of insert requests sent concurrently
+INSERT_WORKERS = 4
+
 
 def create_supabase_client():
     """Create Supabase client with service role key."""
     return create_client(SUPABASE_URL, SUPABASE_KEY)
 
 
+def chunked(rows, size: int):
+    """Yield successive lists of at most `size` rows."""
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def insert_in_chunks(
+    client,
+    table: str,
+    rows: list[dict],
+    returning: ReturnMethod = ReturnMethod.representation,
+    concurrent: bool = True
+) -> list[dict]:
+    """
+    Insert rows into a table in fixed-size chunks.
+
+    Chunks are sent concurrently unless `concurrent` is False, in which case
+    each chunk is committed before the next one is sent.
+
+    Returns the inserted rows in input order. With ReturnMethod.minimal the
+    server sends no rows back and an empty list is returned.
+    """
+    def insert_chunk(chunk):
+        return client.schema("golden_formula_graph").table(table).insert(chunk, returning=returning).execute().data
+
+    chunks = chunked(rows, INSERT_CHUNK_SIZE)
+    if not concurrent:
+        return [row for chunk in chunks for row in insert_chunk(chunk)]
+
+    with ThreadPoolExecutor(max_workers=INSERT_WORKERS) as executor:
+        return [row for inserted in executor.map(insert_chunk, chunks) for row in inserted]
+
+
 def load_formulas_from_json(file_path: Path) -> list[dict]:
     """
     Load formula records from JSON file.
@@ -46,8 +88,7 @@ def extract_unique_domains(formulas: list[dict]) -> list[str]:
     """Extract unique domain names from all formula records."""
     domains = set()
     for formula in formulas:
-        for domain in formula.get("domains", []):
-            domains.add(domain)
+        domains.update(formula.get("domains", ()))
     return sorted(domains)
 
 
@@ -58,12 +99,12 @@ def seed_domains(client, domain_names: list[str]) -> dict[str, str]:
     domains_to_insert = [{"name": name} for name in domain_names]
 
     print(f"Inserting {len(domains_to_insert)} domains...")
-    response = client.schema("golden_formula_graph").table("domains").insert(domains_to_insert).execute()
+    inserted = insert_in_chunks(client, "domains", domains_to_insert)
 
     # Create name -> id mapping
-    domain_map = {d["name"]: d["id"] for d in response.data}
+    domain_map = {d["name"]: d["id"] for d in inserted}
 
-    print(f"Created {len(response.data)} domains")
+    print(f"Created {len(inserted)} domains")
     return domain_map
 
 
@@ -92,22 +133,27 @@ def prepare_formulas_for_insert(formulas: list[dict], domain_map: dict[str, str]
     return formulas_to_insert
 
 
-def seed_formulas(client, formulas_to_insert: list[dict]) -> list[dict]:
-    """Insert formulas into the database."""
+def seed_formulas(client, formulas_to_insert: list[dict]) -> int:
+    """
+    Insert formulas into the database.
+
+    The inserted rows are not needed afterwards, so they are not sent back.
+    Chunks are inserted one after another: the edge trigger on each formula
+    only sees formulas that are already committed, so concurrent chunks
+    would miss the edges between them.
+    Returns the number of formulas inserted.
+    """
     print(f"Inserting {len(formulas_to_insert)} formulas...")
-    response = client.schema("golden_formula_graph").table("formulas").insert(formulas_to_insert).execute()
+    insert_in_chunks(client, "formulas", formulas_to_insert, returning=ReturnMethod.minimal, concurrent=False)
 
-    print(f"Created {len(response.data)} formulas")
-    return response.data
+    print(f"Created {len(formulas_to_insert)} formulas")
+    return len(formulas_to_insert)
 
 
 def clear_existing_data(client):
     """Clear existing data from tables."""
-    print("Clearing existing formulas...")
-    client.schema("golden_formula_graph").table("formulas").delete().neq("id", "00000000-0000-0000-0000-000000000000").execute()
-
-    print("Clearing existing domains...")
-    client.schema("golden_formula_graph").table("domains").delete().neq("id", "00000000-0000-0000-0000-000000000000").execute()
+    print("Clearing existing formulas and domains...")
+    client.schema("golden_formula_graph").rpc("truncate_seed_tables").execute()
 
     print("Existing data cleared")
 
@@ -170,11 +216,11 @@ def main():
     formulas_to_insert = prepare_formulas_for_insert(formulas_raw, domain_map)
 
     # Seed formulas
-    formulas = seed_formulas(client, formulas_to_insert)
+    formulas_count = seed_formulas(client, formulas_to_insert)
 
     print("\nSeeding complete!")
     print(f"  Domains: {len(domain_map)}")
-    print(f"  Formulas: {len(formulas)}")
+    print(f"  Formulas: {formulas_count}")
 
 
 if __name__ == "__main__":
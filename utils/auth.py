@@ -1,24 +1,28 @@
 """Authentication utilities for magic link auth with Supabase."""
 
+import threading
+
 import streamlit as st
-from urllib.parse import urlparse, parse_qs
-from utils.supabase_client import get_supabase_client
+
+# Session state keys used for auth and their logged-out values
+_AUTH_DEFAULTS = {
+    "authenticated": False,
+    "user_email": None,
+    "magic_link_sent": False,
+    "pending_email": None,
+    "access_token": None,
+    "refresh_token": None,
+}
 
 
 def init_auth_state():
     """Initialize authentication session state variables."""
-    if "authenticated" not in st.session_state:
-        st.session_state.authenticated = False
-    if "user_email" not in st.session_state:
-        st.session_state.user_email = None
-    if "magic_link_sent" not in st.session_state:
-        st.session_state.magic_link_sent = False
-    if "pending_email" not in st.session_state:
-        st.session_state.pending_email = None
-    if "access_token" not in st.session_state:
-        st.session_state.access_token = None
-    if "refresh_token" not in st.session_state:
-        st.session_state.refresh_token = None
+    # The keys are never removed, so once set up a session skips the per-key checks
+    if st.session_state.get("auth_state_initialized"):
+        return
+    for key, value in _AUTH_DEFAULTS.items():
+        st.session_state.setdefault(key, value)
+    st.session_state["auth_state_initialized"] = True
 
 
 def send_magic_link(email: str) -> tuple[bool, str]:
@@ -28,6 +32,7 @@ def send_magic_link(email: str) -> tuple[bool, str]:
         tuple: (success: bool, message: str)
     """
     try:
+        from utils.supabase_client import get_supabase_client
         client = get_supabase_client()
         response = client.auth.sign_in_with_otp({
             "email": email,
@@ -56,25 +61,37 @@ def parse_token_from_input(input_str: str) -> tuple[str | None, str | None]:
     """
     input_str = input_str.strip()
 
-    # Check if it's a URL with hash fragment
-    if "#" in input_str:
-        # Extract the fragment part after #
-        fragment = input_str.split("#", 1)[1]
-        # Parse the fragment as query string
-        params = parse_qs(fragment)
-        access_token = params.get("access_token", [None])[0]
-        refresh_token = params.get("refresh_token", [None])[0]
-        return access_token, refresh_token
-
-    # Check if input contains access_token= (fragment without URL)
-    if "access_token=" in input_str:
-        params = parse_qs(input_str)
-        access_token = params.get("access_token", [None])[0]
-        refresh_token = params.get("refresh_token", [None])[0]
-        return access_token, refresh_token
-
-    # Assume it's a direct access token
-    return input_str, None
+    hash_index = input_str.find("#")
+    if hash_index != -1:
+        # URL with hash fragment: keep the part after #
+        fragment = input_str[hash_index + 1:]
+    else:
+        token_index = input_str.find("access_token=")
+        if token_index == -1:
+            # Assume it's a direct access token
+            return input_str, None
+        # Fragment pasted without the URL: start at the token key
+        fragment = input_str[token_index:]
+
+    # Only the two token keys are needed, so scan the pairs directly instead of parsing the whole query string
+    access_token = None
+    refresh_token = None
+    for part in fragment.split("&"):
+        if access_token is None and part.startswith("access_token="):
+            access_token = _decode_fragment_value(part[len("access_token="):])
+        elif refresh_token is None and part.startswith("refresh_token="):
+            refresh_token = _decode_fragment_value(part[len("refresh_token="):])
+        if access_token is not None and refresh_token is not None:
+            break
+    return access_token, refresh_token
+
+
+def _decode_fragment_value(value: str) -> str | None:
+    """Percent-decode a fragment value if needed; empty values count as missing."""
+    if "%" in value or "+" in value:
+        from urllib.parse import unquote_plus
+        value = unquote_plus(value)
+    return value or None
 
 
 def verify_with_token(access_token: str, refresh_token: str | None = None) -> tuple[bool, str]:
@@ -83,8 +100,10 @@ def verify_with_token(access_token: str, refresh_token: str | None = None) -> tu
     Returns:
         tuple: (success: bool, message: str)
     """
+    from supabase_auth.errors import AuthSessionMissingError
+
     try:
-        from utils.supabase_client import _create_client
+        from utils.supabase_client import _create_client, remember_authenticated_client
         client = _create_client()
 
         # Set the session using the tokens from the magic link
@@ -94,31 +113,41 @@ def verify_with_token(access_token: str, refresh_token: str | None = None) -> tu
             # Store tokens in session state for authenticated client to use
             st.session_state.access_token = access_token
             st.session_state.refresh_token = refresh_token
+            # Reuse this client for the session's writes instead of building another and setting the session again
+            remember_authenticated_client(client, access_token)
             st.session_state.authenticated = True
             st.session_state.user_email = response.user.email
             st.session_state.magic_link_sent = False
             st.session_state.pending_email = None
             return True, "Successfully authenticated!"
         return False, "Invalid or expired token."
+    except AuthSessionMissingError:
+        # set_session raises this locally for an expired access token with no refresh token
+        return False, "Magic link expired. Please request a new one."
     except Exception as e:
         return False, f"Verification failed: {str(e)}"
 
 
 def logout():
     """Log out the current user."""
+    # Revoke the session server-side in the background; the local state below is what logs the user out
+    client = st.session_state.get("authenticated_client")
+    if client is not None:
+        threading.Thread(target=_sign_out, args=(client,), daemon=True).start()
+
+    for key, value in _AUTH_DEFAULTS.items():
+        st.session_state[key] = value
+    st.session_state.pop("authenticated_client", None)
+    st.session_state.pop("authenticated_client_token", None)
+
+
+def _sign_out(client):
+    """Sign a client out, ignoring failures."""
     try:
-        client = get_supabase_client()
         client.auth.sign_out()
     except Exception:
         pass
 
-    st.session_state.authenticated = False
-    st.session_state.user_email = None
-    st.session_state.magic_link_sent = False
-    st.session_state.pending_email = None
-    st.session_state.access_token = None
-    st.session_state.refresh_token = None
-
 
 def is_authenticated() -> bool:
     """Check if the user is authenticated."""
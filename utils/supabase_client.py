@@ -1,8 +1,22 @@
 """Supabase client singleton using Streamlit secrets."""
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from postgrest.exceptions import APIError
 from supabase import create_client, Client
 
+# Columns the pages read from each list query; the rest stay in the database
+DOMAIN_COLUMNS = "id,name"
+FORMULA_COLUMNS = "id,principle,domain_ids,reference"
+EDGE_COLUMNS = "formula_a_id,formula_b_id,shared_domain_ids,edge_weight"
+REPLICATED_NODE_COLUMNS = "id,principle,from_domain,reference,domain_count"
+
+# Postgres error code raised when an insert hits a unique constraint or index
+UNIQUE_VIOLATION = "23505"
+
 
 def _create_client() -> Client:
     """Create a new Supabase client instance."""
@@ -11,11 +25,18 @@ def _create_client() -> Client:
     return create_client(url, key)
 
 
+def _literal_regex(text: str) -> str:
+    """Escape text for a Postgres regex so that every character matches literally."""
+    return "".join(c if c.isalnum() else "\\" + c for c in text)
+
+
 @st.cache_resource
 def get_anon_client() -> Client:
     """Get the anonymous Supabase client (for public read operations).
 
     This client is cached and shared - use only for unauthenticated operations.
+    All read helpers go through it so reruns and sessions reuse its pooled
+    HTTP connections instead of building a client per query.
     """
     return _create_client()
 
@@ -23,13 +44,18 @@ def get_anon_client() -> Client:
 def get_authenticated_client() -> Client:
     """Get a Supabase client with the current user's session.
 
-    Creates a new client and sets the session from session state.
+    The client is created once per access token and kept in session state, so
+    every write in a session reuses its pooled HTTP connections instead of
+    building a new client and setting the session again.
     Use this for any write operations that need auth.uid() to work.
     """
+    access_token = st.session_state.get("access_token")
+    if st.session_state.get("authenticated_client_token") == access_token and "authenticated_client" in st.session_state:
+        return st.session_state["authenticated_client"]
+
     client = _create_client()
 
     # If user has tokens stored, set the session
-    access_token = st.session_state.get("access_token")
     refresh_token = st.session_state.get("refresh_token")
 
     if access_token:
@@ -38,9 +64,16 @@ def get_authenticated_client() -> Client:
         except Exception:
             pass
 
+    remember_authenticated_client(client, access_token)
     return client
 
 
+def remember_authenticated_client(client: Client, access_token: str | None):
+    """Keep a client whose session is already set as the session's authenticated client."""
+    st.session_state["authenticated_client"] = client
+    st.session_state["authenticated_client_token"] = access_token
+
+
 def get_supabase_client() -> Client:
     """Get appropriate Supabase client based on auth state.
 
@@ -51,24 +84,83 @@ def get_supabase_client() -> Client:
     return get_anon_client()
 
 
+def fetch_concurrently(*fetchers) -> list:
+    """Run independent fetch functions concurrently and return their results in order.
+
+    Each query blocks on a network round-trip, so running them on threads makes
+    the total wait that of the slowest query rather than the sum of all of them.
+    """
+    ctx = get_script_run_ctx()
+
+    def run(fetcher):
+        # Let Streamlit APIs (secrets, caches) resolve the current session from the worker thread
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fetcher()
+
+    with ThreadPoolExecutor(max_workers=len(fetchers)) as executor:
+        return list(executor.map(run, fetchers))
+
+
+def fetch_all_domains() -> list[dict]:
+    """Fetch all domains from the database, bypassing the cache."""
+    client = get_anon_client()
+    response = client.schema("golden_formula_graph").table("domains").select(DOMAIN_COLUMNS).order("name").execute()
+    return response.data
+
+
+def fetch_all_formulas() -> list[dict]:
+    """Fetch all formulas from the database, bypassing the cache."""
+    client = get_anon_client()
+    response = client.schema("golden_formula_graph").table("formulas").select(FORMULA_COLUMNS).order("created_at", desc=True).execute()
+    return response.data
+
+
+# Cached for the admin page. Callers that cache their own combined snapshot
+# (the main page's load_data()) use the fetch_* functions so every part of
+# the snapshot comes from the same moment.
+@st.cache_data(ttl=300, show_spinner=False)
 def get_all_domains() -> list[dict]:
     """Fetch all domains from the database."""
-    client = get_supabase_client()
-    response = client.schema("golden_formula_graph").table("domains").select("*").order("name").execute()
-    return response.data
+    return fetch_all_domains()
 
 
+@st.cache_data(ttl=300, show_spinner=False)
 def get_all_formulas() -> list[dict]:
     """Fetch all formulas from the database."""
-    client = get_supabase_client()
-    response = client.schema("golden_formula_graph").table("formulas").select("*").order("created_at", desc=True).execute()
-    return response.data
+    return fetch_all_formulas()
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def search_formulas(query: str, offset: int, limit: int) -> tuple[list[dict], int]:
+    """Fetch one page of formulas whose principle contains the query (case-insensitive).
+
+    Returns:
+        tuple: (formulas on the page, total number of matching formulas)
+    """
+    client = get_anon_client()
+    request = client.schema("golden_formula_graph").table("formulas").select(FORMULA_COLUMNS, count="exact")
+    if query:
+        # PostgREST turns every * in an ilike pattern into %, so a literal match is done with a
+        # case-insensitive regex instead, escaping everything that is not a letter or digit
+        request = request.filter("principle", "imatch", _literal_regex(query))
+    response = request.order("created_at", desc=True).range(offset, offset + limit - 1).execute()
+    return response.data, response.count or 0
+
+
+def invalidate_cached_reads():
+    """Clear every cached read after a write.
+
+    This clears all st.cache_data entries, not just the fetchers in this module,
+    so page-level caches built from the data (e.g. the main page's load_data())
+    are refreshed too.
+    """
+    st.cache_data.clear()
 
 
 def get_all_edges() -> list[dict]:
     """Fetch all formula edges from the database."""
-    client = get_supabase_client()
-    response = client.schema("golden_formula_graph").table("formula_edges").select("*").execute()
+    client = get_anon_client()
+    response = client.schema("golden_formula_graph").table("formula_edges").select(EDGE_COLUMNS).execute()
     return response.data
 
 
@@ -76,31 +168,46 @@ def get_replicated_nodes() -> list[dict]:
     """Fetch replicated nodes view for graph visualization.
 
     Each row represents an edge between domain replicas of the same principle.
-    Schema: id, principle, is_base_domain, from_domain, to_domain, reference
+    Columns fetched: id, principle, from_domain, reference, domain_count
     """
-    client = get_supabase_client()
-    response = client.schema("golden_formula_graph").table("replicated_nodes").select("*").execute()
+    client = get_anon_client()
+    response = client.schema("golden_formula_graph").table("replicated_nodes").select(REPLICATED_NODE_COLUMNS).execute()
     return response.data
 
 
 def get_domain_by_id(domain_id: str) -> dict | None:
     """Fetch a single domain by ID."""
-    client = get_supabase_client()
+    client = get_anon_client()
     response = client.schema("golden_formula_graph").table("domains").select("*").eq("id", domain_id).execute()
     return response.data[0] if response.data else None
 
 
-def get_domain_by_name(name: str) -> dict | None:
-    """Fetch a single domain by name (for duplicate checking)."""
+def create_domain(name: str) -> dict:
+    """Create a new domain.
+
+    Raises an APIError with code UNIQUE_VIOLATION if a domain with the same
+    name, ignoring case, already exists.
+    """
     client = get_supabase_client()
-    response = client.schema("golden_formula_graph").table("domains").select("*").eq("name", name).execute()
-    return response.data[0] if response.data else None
+    response = client.schema("golden_formula_graph").table("domains").insert({"name": name}).execute()
+    invalidate_cached_reads()
+    return response.data[0] if response.data else {}
 
 
-def create_domain(name: str) -> dict:
-    """Create a new domain."""
+def get_or_create_domain(name: str) -> dict:
+    """Return the domain with this name, ignoring case, creating it if it does not exist."""
     client = get_supabase_client()
-    response = client.schema("golden_formula_graph").table("domains").insert({"name": name}).execute()
+    try:
+        # The upsert hands back the existing row when the exact name is already taken
+        response = client.schema("golden_formula_graph").table("domains").upsert({"name": name}, on_conflict="name").execute()
+    except APIError as e:
+        if e.code != UNIQUE_VIOLATION:
+            raise
+        # A case variant of the name exists (lower(name) index), so read that row instead
+        response = client.schema("golden_formula_graph").table("domains").select("*").filter(
+            "name", "imatch", f"^{_literal_regex(name)}$"
+        ).execute()
+    invalidate_cached_reads()
     return response.data[0] if response.data else {}
 
 
@@ -108,6 +215,7 @@ def update_domain(domain_id: str, name: str) -> dict:
     """Update a domain's name."""
     client = get_supabase_client()
     response = client.schema("golden_formula_graph").table("domains").update({"name": name}).eq("id", domain_id).execute()
+    invalidate_cached_reads()
     return response.data[0] if response.data else {}
 
 
@@ -115,23 +223,10 @@ def delete_domain(domain_id: str) -> bool:
     """Delete a domain by ID."""
     client = get_supabase_client()
     client.schema("golden_formula_graph").table("domains").delete().eq("id", domain_id).execute()
+    invalidate_cached_reads()
     return True
 
 
-def is_domain_used_by_formulas(domain_id: str) -> bool:
-    """Check if a domain is referenced by any formulas."""
-    client = get_supabase_client()
-    response = client.schema("golden_formula_graph").table("formulas").select("id").contains("domain_ids", [domain_id]).execute()
-    return len(response.data) > 0
-
-
-def get_formulas_using_domain(domain_id: str) -> list[dict]:
-    """Get all formulas that use a specific domain."""
-    client = get_supabase_client()
-    response = client.schema("golden_formula_graph").table("formulas").select("*").contains("domain_ids", [domain_id]).execute()
-    return response.data
-
-
 def create_formula(principle: str, domain_ids: list[str], reference: str) -> dict:
     """Create a new formula."""
     client = get_supabase_client()
@@ -140,6 +235,7 @@ def create_formula(principle: str, domain_ids: list[str], reference: str) -> dic
         "domain_ids": domain_ids,
         "reference": reference
     }).execute()
+    invalidate_cached_reads()
     return response.data[0] if response.data else {}
 
 
@@ -151,6 +247,7 @@ def update_formula(formula_id: str, principle: str, domain_ids: list[str], refer
         "domain_ids": domain_ids,
         "reference": reference
     }).eq("id", formula_id).execute()
+    invalidate_cached_reads()
     return response.data[0] if response.data else {}
 
 
@@ -158,48 +255,28 @@ def delete_formula(formula_id: str) -> bool:
     """Delete a formula by ID."""
     client = get_supabase_client()
     client.schema("golden_formula_graph").table("formulas").delete().eq("id", formula_id).execute()
+    invalidate_cached_reads()
     return True
 
 
 def get_formula_by_id(formula_id: str) -> dict | None:
     """Fetch a single formula by ID."""
-    client = get_supabase_client()
+    client = get_anon_client()
     response = client.schema("golden_formula_graph").table("formulas").select("*").eq("id", formula_id).execute()
     return response.data[0] if response.data else None
 
 
-def remove_domain_from_formulas(domain_id: str) -> int:
-    """Remove a domain ID from all formulas that reference it.
-
-    Returns the number of formulas updated.
-    """
-    formulas = get_formulas_using_domain(domain_id)
-    updated_count = 0
-
-    for formula in formulas:
-        current_domain_ids = formula.get("domain_ids", [])
-        new_domain_ids = [did for did in current_domain_ids if did != domain_id]
-
-        update_formula(
-            formula_id=formula["id"],
-            principle=formula["principle"],
-            domain_ids=new_domain_ids,
-            reference=formula.get("reference", "")
-        )
-        updated_count += 1
-
-    return updated_count
-
-
 def delete_domain_cascade(domain_id: str) -> tuple[bool, int]:
     """Delete a domain and remove it from all formulas that reference it.
 
+    Both steps run in one database transaction, so a failure leaves the domain
+    and its formulas untouched.
+
     Returns (success, number of formulas updated).
     """
-    # First remove the domain from all formulas
-    updated_count = remove_domain_from_formulas(domain_id)
-
-    # Then delete the domain
-    delete_domain(domain_id)
-
-    return True, updated_count
+    client = get_supabase_client()
+    response = client.schema("golden_formula_graph").rpc(
+        "delete_domain_cascade", {"target_domain_id": domain_id}
+    ).execute()
+    invalidate_cached_reads()
+    return True, response.data or 0
@@ -1,24 +1,11 @@
 """Plotly graph generation utilities for knowledge graph visualization."""
 
-def build_domain_lookup(domains: list[dict]) -> dict[str, dict]:
-    """Build a lookup dictionary from domain ID to domain info with color."""
-    lookup = {}
-    for i, domain in enumerate(domains):
-        lookup[domain["id"]] = {
-            "name": domain["name"],
-            "index": i
-        }
-    return lookup
+def build_domain_lookup(domains: list[dict]) -> dict[str, str]:
+    """Build a lookup dictionary from domain ID to domain name."""
+    return {domain["id"]: domain["name"] for domain in domains}
 
 
-def resolve_formula_domains(formula: dict, domain_lookup: dict[str, dict]) -> list[dict]:
-    """Resolve domain IDs to domain info for a formula."""
+def resolve_formula_domain_names(formula: dict, domain_lookup: dict[str, str]) -> list[str]:
+    """Resolve a formula's domain IDs to their names, skipping unknown IDs."""
     domain_ids = formula.get("domain_ids") or []
-    resolved = []
-    for domain_id in domain_ids:
-        if domain_id in domain_lookup:
-            resolved.append({
-                "id": domain_id,
-                **domain_lookup[domain_id]
-            })
-    return resolved
\ No newline at end of file
+    return [domain_lookup[domain_id] for domain_id in domain_ids if domain_id in domain_lookup]